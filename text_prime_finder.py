@@ -1,169 +1,638 @@
 import os
+import atexit
+import functools
+import gzip
+import hashlib
+import heapq
+import html
+import itertools
+import json
 import logging
 import math
+import mmap
+import operator
+import orjson
+import queue
 import requests
 import re
-from flask import Flask, request, render_template_string, jsonify
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+from flask import Flask, Response, request, jsonify, abort
 import random
-import jieba
+# 優先使用 jieba 的 Cython 加速版本 jieba_fast（分詞結果相同），未安裝時回退到 jieba
+try:
+    import jieba_fast as jieba
+except ImportError:
+    import jieba
+# 可選依賴：安裝 gmpy2 時，Miller–Rabin 使用 GMP 的強偽質數測試
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
 
-# 設置日誌
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# 設置日誌：請求線程只把日誌記錄放入隊列，由後台監聽線程寫出，不在請求路徑上同步寫入 stderr
+# QueueHandler 在放入隊列前已按 format 格式化訊息，監聽端的 StreamHandler 直接輸出
+log_queue = queue.SimpleQueue()
+log_stream_handler = logging.StreamHandler()
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[QueueHandler(log_queue)]
+)
 logger = logging.getLogger('TextPrimeFinder')
+log_listener = None
+
+def start_log_listener():
+    """啟動把隊列中的日誌寫出的監聽線程"""
+    global log_listener
+    log_listener = QueueListener(log_queue, log_stream_handler)
+    log_listener.start()
+
+def stop_log_listener():
+    """停止監聽線程，並寫出隊列中剩餘的日誌"""
+    if log_listener is not None:
+        log_listener.stop()
+
+start_log_listener()
+atexit.register(stop_log_listener)
+# fork 出的子進程（例如 gunicorn worker）不會繼承監聽線程，需重新啟動
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=start_log_listener)
 
 app = Flask(__name__)
 
+# 用於並行分析單詞的線程池
+analysis_executor = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 4))
+
+# 模組級的 jieba 分詞器，在啟動時初始化一次，之後所有請求共用
+jieba_tokenizer = jieba.Tokenizer()
+
+# 支持的中文處理模式，其他值按 "auto" 處理
+CHINESE_MODES = ("auto", "char", "space")
+# 超過此長度（字符數）的文字不寫入按全文緩存的 lru_cache，避免少量大請求長期佔用內存；
+# 重複的請求幾乎都是短文字，此長度下單個響應緩存條目最多約 31 KB
+TEXT_CACHE_MAX_LENGTH = 256
+
 # PrimesDB 相關常量和函數
 PRIMESDB_URL = "https://github.com/pekesoft/PrimesDB/raw/main/PrimesDB/0000.pdb"
 PRIMESDB_CACHE_FILE = "primesdb_cache.bin"
+PRIMESDB_ETAG_FILE = PRIMESDB_CACHE_FILE + ".etag"
+# 下載時記錄緩存文件的 SHA-256，啟動時校驗，損壞或不完整的緩存會被重新下載
+PRIMESDB_SHA256_FILE = PRIMESDB_CACHE_FILE + ".sha256"
+# 本地緩存在此秒數內已向伺服器驗證過時，啟動時直接使用，不再發送條件請求
+PRIMESDB_REVALIDATE_INTERVAL = 24 * 60 * 60
+# 下載 PrimesDB 時每次寫入磁盤的塊大小
+PRIMESDB_DOWNLOAD_CHUNK = 1 << 20
 primesdb_data = None
+# PrimesDB 映射的字節數，加載時記錄一次，避免每次查詢都調用 len()
+primesdb_size = 0
+# 防止多個線程同時下載或映射 PrimesDB
+primesdb_lock = threading.Lock()
+# 後台預加載 PrimesDB 結束（無論成功與否）時設置
+primesdb_ready = threading.Event()
+
+# PrimesDB 的每個字節存儲兩個十位段：低 4 位對應奇數十位段，高 4 位對應偶數十位段
+# 地址 a 的第 0-7 位依次表示 20a + 10 加上以下偏移量的數字是否為質數
+PRIMESDB_BIT_OFFSETS = (1, 3, 7, 9, 11, 13, 17, 19)
+# 以 number % 60 為索引的位偏移表：一次查表同時排除 2、3、5 的倍數（-1），
+# 並得到該數在字節中的位偏移（60 是 20 的倍數，(r - 10) % 20 即為相對 20a + 10 的偏移量）
+PRIMESDB_RESIDUE_BIT = tuple(
+    PRIMESDB_BIT_OFFSETS.index((r - 10) % 20) if math.gcd(r, 30) == 1 else -1
+    for r in range(60)
+)
+# 預先計算每個字節值中被設置的位所對應的偏移量（升序和降序）
+PRIMESDB_BYTE_OFFSETS = tuple(
+    tuple(offset for bit, offset in enumerate(PRIMESDB_BIT_OFFSETS) if (byte_value >> bit) & 1)
+    for byte_value in range(256)
+)
+PRIMESDB_BYTE_OFFSETS_DESC = tuple(offsets[::-1] for offsets in PRIMESDB_BYTE_OFFSETS)
+# 每次從 PrimesDB 讀取的字節數
+PRIMESDB_SCAN_CHUNK = 64
+# 小於 10 的質數不在 PrimesDB 中
+SMALL_PRIMES_BELOW_10 = (2, 3, 5, 7)
+
+# 模 210 輪篩：與 2·3·5·7 互質的餘數標記為 1
+WHEEL210_MASK = bytes(1 if math.gcd(i, 210) == 1 else 0 for i in range(210))
+
+# 預編譯的字符分類正則表達式，在 C 層完成整個字符串的掃描
+CJK_RE = re.compile('[\u4e00-\u9fff]')
+ASCII_ALNUM_RE = re.compile('[0-9A-Za-z]+')
+
+# 36進位數字對應的 ASCII 字符
+BASE36_DIGITS = b'0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+# 小質數位圖篩：低於上限的 is_prime 查詢直接查表（只存奇數，約 1 MB）
+SMALL_SIEVE_LIMIT = 1 << 24
+SIEVE_BITS_TABLE = bytes.maketrans(b'\x00\x01', b'01')
+small_sieve = None
+small_sieve_lock = threading.Lock()
+
+# Miller–Rabin 之前用於試除的小質數：256 以下除 2、3 外的 52 個質數
+TRIAL_DIVISION_PRIMES = tuple(
+    p for p in range(5, 256, 2) if all(p % d for d in range(3, math.isqrt(p) + 1, 2))
+)
+
+# Miller–Rabin 見證數按 n 的大小分級：n 小於上限時，使用對應的見證數可得到確定性結果
+# 較小的 n 只需較少的見證數，減少模冪運算次數
+MR_WITNESS_TIERS = (
+    (4_759_123_141, (2, 7, 61)),
+    (1_122_004_669_633, (2, 13, 23, 1662803)),
+    (2_152_302_898_747, (2, 3, 5, 7, 11)),
+    (3_474_749_660_383, (2, 3, 5, 7, 11, 13)),
+    (341_550_071_728_321, (2, 3, 5, 7, 11, 13, 17)),
+    (3_825_123_056_546_413_051, (2, 3, 5, 7, 11, 13, 17, 19, 23)),
+    (318_665_857_834_031_151_167_461, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)),
+)
+# 更大的數字使用前 13 個質數，對 n < MR_DETERMINISTIC_LIMIT 仍是確定性的
+# （僅用前 12 個質數時 318,665,857,834,031,151,167,461 會被誤判）
+MR_WITNESSES_LARGE = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+# 不低於此上限的數字可被構造為通過全部 13 個見證數的合數（上限本身即是一例），
+# 因此在 Miller–Rabin 之後再做強 Lucas 測試，組成 BPSW 測試
+MR_DETERMINISTIC_LIMIT = 3_317_044_064_679_887_385_961_981
 
 def download_primesdb():
-    """下載 PrimesDB 數據文件"""
-    global primesdb_data
+    """下載 PrimesDB 數據文件（以 ETag 重新驗證本地緩存），並以唯讀 mmap 映射到內存"""
+    with primesdb_lock:
+        # 等待鎖期間其他線程可能已完成加載
+        if primesdb_data is not None:
+            return True
+        return _download_primesdb()
+
+def preload_primesdb():
+    """在後台線程中加載 PrimesDB，結束後設置 primesdb_ready"""
+    try:
+        download_primesdb()
+    finally:
+        primesdb_ready.set()
+
+def _download_primesdb():
+    """download_primesdb 的實際實現，調用前須持有 primesdb_lock"""
+    global primesdb_data, primesdb_size
     try:
+        has_cache = os.path.exists(PRIMESDB_CACHE_FILE)
+        headers = {}
+        
+        # 校驗本地緩存，損壞時當作沒有緩存，重新完整下載
+        if has_cache and not verify_primesdb_cache():
+            logger.warning(f"PrimesDB 本地緩存校驗失敗，重新下載: {PRIMESDB_CACHE_FILE}")
+            has_cache = False
+        
         # 首先檢查是否有本地緩存
-        if os.path.exists(PRIMESDB_CACHE_FILE):
-            logger.info(f"從本地緩存加載 PrimesDB: {PRIMESDB_CACHE_FILE}")
-            with open(PRIMESDB_CACHE_FILE, 'rb') as f:
-                primesdb_data = f.read()
-            return True
+        if has_cache:
+            etag = read_primesdb_etag()
+            if etag is None:
+                # 沒有 ETag 可供重新驗證，直接使用本地緩存
+                logger.info(f"從本地緩存加載 PrimesDB: {PRIMESDB_CACHE_FILE}")
+            elif primesdb_recently_validated():
+                logger.info(f"PrimesDB 本地緩存最近已驗證，直接加載: {PRIMESDB_CACHE_FILE}")
+            else:
+                headers['If-None-Match'] = etag
         
-        # 如果沒有本地緩存，從 GitHub 下載
-        logger.info(f"從 GitHub 下載 PrimesDB: {PRIMESDB_URL}")
-        response = requests.get(PRIMESDB_URL)
-        if response.status_code == 200:
-            primesdb_data = response.content
-            # 保存到本地緩存
-            with open(PRIMESDB_CACHE_FILE, 'wb') as f:
-                f.write(primesdb_data)
-            logger.info(f"PrimesDB 下載成功，大小: {len(primesdb_data)} 字節")
-            return True
-        else:
-            logger.error(f"下載 PrimesDB 失敗: {response.status_code}")
-            return False
+        if headers or not has_cache:
+            # 如果沒有本地緩存，從 GitHub 下載；否則發送條件請求，未變更時伺服器返回 304
+            logger.info(f"從 GitHub 下載 PrimesDB: {PRIMESDB_URL}")
+            try:
+                response = requests.get(PRIMESDB_URL, headers=headers, stream=True, timeout=30)
+            except requests.RequestException as e:
+                if not has_cache:
+                    raise
+                logger.warning(f"無法重新驗證 PrimesDB，使用本地緩存: {e}")
+            else:
+                with response:
+                    if response.status_code == 304:
+                        logger.info(f"PrimesDB 未變更，從本地緩存加載: {PRIMESDB_CACHE_FILE}")
+                        # 更新 ETag 文件的修改時間，記錄本次驗證
+                        os.utime(PRIMESDB_ETAG_FILE)
+                    elif response.status_code == 200:
+                        # 分塊流式寫入本地緩存，不在內存中保留整個文件，並記錄 ETag 供下次啟動時驗證
+                        # 先寫入臨時文件再替換，避免截斷其他進程正在映射的緩存文件
+                        size = 0
+                        digest = hashlib.sha256()
+                        tmp_file = PRIMESDB_CACHE_FILE + ".tmp"
+                        try:
+                            with open(tmp_file, 'wb') as f:
+                                for chunk in response.iter_content(chunk_size=PRIMESDB_DOWNLOAD_CHUNK):
+                                    f.write(chunk)
+                                    digest.update(chunk)
+                                    size += len(chunk)
+                            # 未經壓縮傳輸時，收到的字節數須與 Content-Length 一致，否則連接提前關閉，文件不完整
+                            # 不完整的文件不能替換緩存，否則其 SHA-256 和 ETag 會被記錄，之後的啟動都會接受它
+                            expected_size = response.headers.get('Content-Length', '')
+                            if ('Content-Encoding' not in response.headers and expected_size.isdigit()
+                                    and size != int(expected_size)):
+                                raise OSError(f"下載不完整: 收到 {size} 字節，預期 {expected_size} 字節")
+                        except (requests.RequestException, OSError) as e:
+                            # 下載中途失敗：刪除不完整的臨時文件，有本地緩存時繼續使用
+                            remove_file_quietly(tmp_file)
+                            if not has_cache:
+                                raise
+                            logger.warning(f"下載 PrimesDB 中斷，使用本地緩存: {e}")
+                        else:
+                            os.replace(tmp_file, PRIMESDB_CACHE_FILE)
+                            write_primesdb_etag(response.headers.get('ETag'))
+                            write_primesdb_sha256(digest.hexdigest())
+                            logger.info(f"PrimesDB 下載成功，大小: {size} 字節")
+                    elif has_cache:
+                        logger.warning(f"重新驗證 PrimesDB 失敗: {response.status_code}，使用本地緩存")
+                    else:
+                        logger.error(f"下載 PrimesDB 失敗: {response.status_code}")
+                        return False
+        
+        # 使用 mmap 映射緩存文件：頁面按需載入，且多個 worker 共用系統的頁面緩存
+        # mmap 會自行複製文件描述符，因此關閉文件後映射仍然有效
+        with open(PRIMESDB_CACHE_FILE, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # 先記錄大小再發佈映射，其他線程看到 primesdb_data 時大小已經正確
+        primesdb_size = len(data)
+        primesdb_data = data
+        return True
     except Exception as e:
         logger.error(f"下載 PrimesDB 時出錯: {e}")
         return False
 
+def close_primesdb():
+    """關閉 PrimesDB 的內存映射，在進程退出時調用"""
+    global primesdb_data, primesdb_size
+    # 下載仍在進行時鎖被持有，此時不等待下載完成，以免進程退出被阻塞；映射由操作系統在退出時回收
+    if not primesdb_lock.acquire(blocking=False):
+        return
+    try:
+        if primesdb_data is not None:
+            data = primesdb_data
+            primesdb_data = None
+            primesdb_size = 0
+            data.close()
+    finally:
+        primesdb_lock.release()
+
+atexit.register(close_primesdb)
+
+def remove_file_quietly(path):
+    """刪除文件，文件不存在或無法刪除時忽略"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def read_primesdb_etag():
+    """讀取本地緩存對應的 ETag，不存在時返回 None"""
+    try:
+        with open(PRIMESDB_ETAG_FILE, 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def write_primesdb_etag(etag):
+    """保存本地緩存對應的 ETag；伺服器未提供 ETag 時刪除舊記錄"""
+    if etag:
+        with open(PRIMESDB_ETAG_FILE, 'w', encoding='utf-8') as f:
+            f.write(etag)
+    elif os.path.exists(PRIMESDB_ETAG_FILE):
+        os.remove(PRIMESDB_ETAG_FILE)
+
+def verify_primesdb_cache():
+    """以下載時記錄的 SHA-256 校驗本地緩存；沒有記錄時（舊版本的緩存）視為有效"""
+    try:
+        with open(PRIMESDB_SHA256_FILE, 'r', encoding='utf-8') as f:
+            expected = f.read().strip()
+        recorded_at = os.stat(PRIMESDB_SHA256_FILE).st_mtime_ns
+    except OSError:
+        return True
+    
+    # 緩存文件在記錄 SHA-256 之後未被修改時無需重新計算，避免每次啟動都讀取整個文件
+    if os.stat(PRIMESDB_CACHE_FILE).st_mtime_ns <= recorded_at:
+        return True
+    
+    digest = hashlib.sha256()
+    with open(PRIMESDB_CACHE_FILE, 'rb') as f:
+        for chunk in iter(lambda: f.read(PRIMESDB_DOWNLOAD_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest() == expected
+
+def primesdb_recently_validated():
+    """ETag 文件在每次向伺服器驗證後更新，以其修改時間判斷距上次驗證是否未超過 PRIMESDB_REVALIDATE_INTERVAL"""
+    try:
+        return time.time() - os.stat(PRIMESDB_ETAG_FILE).st_mtime < PRIMESDB_REVALIDATE_INTERVAL
+    except OSError:
+        return False
+
+def write_primesdb_sha256(hexdigest):
+    """保存本地緩存的 SHA-256"""
+    with open(PRIMESDB_SHA256_FILE, 'w', encoding='utf-8') as f:
+        f.write(hexdigest)
+
+@functools.lru_cache(maxsize=200_000)
 def is_prime_primesdb(number):
-    """使用 PrimesDB 檢查一個數字是否為質數"""
+    """使用 PrimesDB 檢查一個數字是否為質數（結果以 lru_cache 緩存）"""
     global primesdb_data
     
-    # 如果數據未加載，嘗試加載
-    if primesdb_data is None:
-        if not download_primesdb():
-            # 如果無法加載 PrimesDB，回退到傳統方法
-            return is_prime(number)
-    
-    # 使用 PrimesDB 算法檢查質數
-    # 首先檢查基本情況
+    # 首先檢查基本情況：2、3、5 的倍數不需要數據即可判斷，也不會觸發加載
     if number < 2:
         return False
     if number == 2 or number == 3 or number == 5 or number == 7:
         return True
-    if number % 2 == 0 or number % 3 == 0 or number % 5 == 0:
-        return False
     
-    # 只檢查末尾為 1, 3, 7, 9 的數字
-    last_digit = number % 10
-    if last_digit not in [1, 3, 7, 9]:
+    # 一次取模和查表同時完成 2、3、5 的整除檢查並取得位偏移
+    bit_pos = PRIMESDB_RESIDUE_BIT[number % 60]
+    if bit_pos < 0:
         return False
     
+    # 如果數據未加載，嘗試加載
+    if primesdb_data is None:
+        if not download_primesdb():
+            # 如果無法加載 PrimesDB，回退到傳統方法
+            return is_prime(number)
+    
     # 計算 PrimesDB 中的位置
-    decade = number // 10
-    address = int(decade / 2 + 0.5) - 1
+    data = primesdb_data
+    address = (number // 10 + 1) // 2 - 1
     
     # 檢查地址是否在數據範圍內
-    if address < 0 or address >= len(primesdb_data):
+    if address < 0 or address >= primesdb_size:
         # 如果超出範圍，回退到傳統方法
         return is_prime(number)
     
-    # 計算位偏移
-    bit_positions = {1: 0, 3: 1, 7: 2, 9: 3}
-    bit_pos = bit_positions[last_digit]
-    
-    # 如果十位數是偶數，使用高位元組
-    if decade % 2 == 0:
-        bit_pos += 4
-    
     # 獲取字節並檢查相應的位
-    byte_value = primesdb_data[address]
-    is_prime_value = (byte_value >> bit_pos) & 1
-    
-    return is_prime_value == 1
+    return (data[address] >> bit_pos) & 1 == 1
 
 def is_prime(n):
-    """傳統方法檢查質數"""
+    """傳統方法檢查質數：小數字查詢位圖篩，大數字使用 Miller–Rabin"""
     if n <= 1:
         return False
     if n <= 3:
         return True
     if n % 2 == 0 or n % 3 == 0:
         return False
-    i = 5
-    while i * i <= n:
-        if n % i == 0 or n % (i + 2) == 0:
+    if n < SMALL_SIEVE_LIMIT:
+        # 位圖篩只存儲奇數，第 i 位對應 2i + 1
+        i = n >> 1
+        return (get_small_sieve()[i >> 3] >> (i & 7)) & 1 == 1
+    # 先用 256 以下的小質數試除，以低成本排除大部分合數，再進入 Miller–Rabin
+    for p in TRIAL_DIVISION_PRIMES:
+        if n % p == 0:
+            return False
+    if not _miller_rabin(n):
+        return False
+    # 超出確定性範圍時，再以強 Lucas 測試排除針對固定見證數構造的強偽質數
+    return n < MR_DETERMINISTIC_LIMIT or _strong_lucas_prp(n)
+
+def get_small_sieve():
+    """返回小質數位圖篩，首次調用時建立"""
+    global small_sieve
+    if small_sieve is None:
+        with small_sieve_lock:
+            if small_sieve is None:
+                small_sieve = build_small_sieve(SMALL_SIEVE_LIMIT)
+    return small_sieve
+
+def build_small_sieve(limit):
+    """建立 limit 以內奇數的埃拉托斯特尼位圖篩（每個奇數 1 位），第 i 位表示 2i + 1 是否為質數"""
+    size = limit // 2
+    sieve = bytearray(b'\x01') * size
+    sieve[0] = 0  # 1 不是質數
+    for i in range(3, math.isqrt(limit) + 1, 2):
+        if sieve[i >> 1]:
+            # 從 i*i 開始劃去 i 的奇數倍，索引步長為 i
+            start = (i * i) >> 1
+            sieve[start::i] = bytes(len(range(start, size, i)))
+    
+    # 將每個字節壓縮為 1 位：轉為 '0'/'1' 字符串並反轉後按二進制解析，再以小端序輸出
+    bits = int(sieve.translate(SIEVE_BITS_TABLE)[::-1], 2)
+    return bits.to_bytes((size + 7) // 8, 'little')
+
+def mr_witnesses(n):
+    """返回足以對 n 得出確定性結果的最小 Miller–Rabin 見證數組"""
+    for limit, witnesses in MR_WITNESS_TIERS:
+        if n < limit:
+            return witnesses
+    return MR_WITNESSES_LARGE
+
+def _miller_rabin(n, witnesses=None):
+    """Miller–Rabin 質數測試，n 須為大於所有見證數的奇數；未指定見證數時按 n 的大小選擇"""
+    if witnesses is None:
+        witnesses = mr_witnesses(n)
+    
+    if gmpy2 is not None:
+        # GMP 的模冪運算使用 Montgomery 約簡，比內建的 pow() 更快
+        mpz_n = gmpy2.mpz(n)
+        return all(gmpy2.is_strong_prp(mpz_n, a) for a in witnesses)
+    
+    # 分解 n - 1 = d * 2^s
+    d = n - 1
+    s = 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    
+    for a in witnesses:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
             return False
-        i += 6
     return True
 
+def _jacobi(a, n):
+    """計算 Jacobi 符號 (a/n)，n 須為正奇數"""
+    a %= n
+    result = 1
+    while a:
+        while a % 2 == 0:
+            a //= 2
+            if n % 8 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a % 4 == 3 and n % 4 == 3:
+            result = -result
+        a %= n
+    return result if n == 1 else 0
+
+def _strong_lucas_prp(n):
+    """強 Lucas 可能質數測試（以 Selfridge 方法 A 選取 D、P、Q），n 須為大於 3 的奇數"""
+    if gmpy2 is not None:
+        return gmpy2.is_strong_selfridge_prp(gmpy2.mpz(n))
+    
+    # 完全平方數不存在 (D/n) = -1 的 D，需先排除
+    if math.isqrt(n) ** 2 == n:
+        return False
+    
+    # 依次嘗試 D = 5, -7, 9, -11, ...，直到 Jacobi 符號 (D/n) = -1
+    D = 5
+    while True:
+        j = _jacobi(D, n)
+        if j == -1:
+            break
+        if j == 0 and abs(D) != n:
+            return False
+        D = -D - 2 if D > 0 else -D + 2
+    P, Q = 1, (1 - D) // 4
+    
+    # 分解 n + 1 = d * 2^s
+    d = n + 1
+    s = 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    
+    # 由高位到低位用倍增公式計算 U_d、V_d 及 Q^d（模 n）
+    U, V, Qk = 1, P, Q % n
+    for bit in bin(d)[3:]:
+        U = U * V % n
+        V = (V * V - 2 * Qk) % n
+        Qk = Qk * Qk % n
+        if bit == '1':
+            U, V = P * U + V, D * U + P * V
+            # 模 n 下除以 2：奇數先加上 n（n 為奇數）
+            if U & 1:
+                U += n
+            if V & 1:
+                V += n
+            U = (U >> 1) % n
+            V = (V >> 1) % n
+            Qk = Qk * Q % n
+    
+    if U == 0 or V == 0:
+        return True
+    for _ in range(s - 1):
+        V = (V * V - 2 * Qk) % n
+        if V == 0:
+            return True
+        Qk = Qk * Qk % n
+    return False
+
 def find_primes_near(number, count, direction):
     """查找指定數字附近的質數"""
+    return list(itertools.islice(iter_primes_near(number, direction), count))
+
+def iter_primes_near(number, direction):
+    """按與 number 的距離由近到遠，逐個產生指定方向上的質數"""
     global primesdb_data
     
     # 如果數據未加載，嘗試加載
     if primesdb_data is None:
         if not download_primesdb():
             # 如果無法加載 PrimesDB，回退到傳統方法
-            return find_primes_near_traditional(number, count, direction)
+            return iter_primes_traditional(number, direction)
     
     # 如果數字超過 PrimesDB 的範圍 (約 1,342,177,280)，使用傳統方法
     if number > 1000000000:  # 設置一個安全的閾值
-        return find_primes_near_traditional(number, count, direction)
+        return iter_primes_traditional(number, direction)
     
-    result = []
-    current = number
+    # 直接逐字節掃描 PrimesDB 位圖，而不是對每個數字調用 is_prime_primesdb
+    if direction == 'smaller':
+        return scan_primesdb_smaller(number - 1)
+    return scan_primesdb_larger(number + 1)
+
+def scan_primesdb_larger(start):
+    """從 start 開始向上掃描 PrimesDB，依次產生不小於 start 的質數"""
+    if start <= 1:
+        return
     
-    # 根據方向調整步進
-    step = 1 if direction == 'larger' else -1
+    # 小於 10 的質數不在 PrimesDB 中
+    for p in SMALL_PRIMES_BELOW_10:
+        if p >= start:
+            yield p
     
-    # 如果是向下查找，先減 1
-    if direction == 'smaller':
-        current -= 1
-    # 如果是向上查找，先加 1
-    else:
-        current += 1
+    data = primesdb_data
+    size = primesdb_size
+    address = max(0, (start // 10 + 1) // 2 - 1)
     
-    # 查找指定數量的質數
-    while len(result) < count and current > 1 and current < 10**10:  # 設置一個上限，避免無限循環
-        if is_prime_primesdb(current):
-            result.append(current)
-        current += step
+    while address < size:
+        # 每次讀取一段字節，在 C 層迭代，避免逐個索引
+        for byte_value in data[address:address + PRIMESDB_SCAN_CHUNK]:
+            base = 20 * address + 10
+            for offset in PRIMESDB_BYTE_OFFSETS[byte_value]:
+                prime = base + offset
+                if prime >= start and prime % 3 != 0:
+                    yield prime
+            address += 1
     
-    return result
+    # 超出 PrimesDB 範圍，之後回退到傳統方法
+    last_covered = max(start - 1, 20 * size + 9)
+    yield from iter_primes_traditional(last_covered, 'larger')
 
-def find_primes_near_traditional(number, count, direction):
-    """使用傳統方法查找指定數字附近的質數"""
-    result = []
-    current = number
+def scan_primesdb_smaller(start):
+    """從 start 開始向下掃描 PrimesDB，依次產生不大於 start 的質數"""
+    if start <= 1:
+        return
     
-    # 根據方向調整步進
-    step = 1 if direction == 'larger' else -1
+    data = primesdb_data
+    address = (start // 10 + 1) // 2 - 1
     
-    # 如果是向下查找，先減 1
-    if direction == 'smaller':
-        current -= 1
-    # 如果是向上查找，先加 1
+    # 起點超出 PrimesDB 範圍，使用傳統方法
+    if address >= primesdb_size:
+        yield from iter_primes_traditional(start + 1, 'smaller')
+        return
+    
+    while address >= 0:
+        low = max(0, address - PRIMESDB_SCAN_CHUNK + 1)
+        for byte_value in reversed(data[low:address + 1]):
+            base = 20 * address + 10
+            for offset in PRIMESDB_BYTE_OFFSETS_DESC[byte_value]:
+                prime = base + offset
+                if prime <= start and prime % 3 != 0:
+                    yield prime
+            address -= 1
+    
+    # 小於 10 的質數不在 PrimesDB 中
+    for p in reversed(SMALL_PRIMES_BELOW_10):
+        if p <= start:
+            yield p
+
+def find_primes_near_traditional(number, count, direction):
+    """使用傳統方法查找指定數字附近的質數"""
+    return list(itertools.islice(iter_primes_traditional(number, direction), count))
+
+def iter_primes_traditional(number, direction):
+    """使用傳統方法，按與 number 的距離由近到遠逐個產生質數"""
+    # 2 是唯一的偶質數，單獨處理；其餘候選數只取奇數，每次步進 2
+    if direction == 'larger':
+        # 如果是向上查找，先加 1
+        current = number + 1
+        if current <= 1:
+            return
+        if current == 2:
+            yield 2
+        current = max(current, 3) | 1
+        step = 2
     else:
-        current += 1
+        # 如果是向下查找，先減 1
+        current = number - 1
+        if current <= 1:
+            return
+        if current % 2 == 0:
+            current -= 1
+        step = -2
     
-    # 查找指定數量的質數
-    while len(result) < count and current > 1:
-        if is_prime(current):
-            result.append(current)
+    # 與 3、5、7 有公因數的奇數候選只需一次查表即可排除
+    mask = WHEEL210_MASK
+    while current > 1:
+        if (current < 11 or mask[current % 210]) and is_prime(current):
+            yield current
         current += step
     
+    # 只有向下查找會結束循環，最後產生 2
+    yield 2
+
+@functools.lru_cache(maxsize=4096)
+def _find_closest_primes_cached(number, count):
+    """查詢最接近的質數，返回 (質數, 距離) 元組的元組，以便 lru_cache 緩存"""
+    # 從 number 向兩側同時展開：兩個方向的質數各自按距離遞增產生，
+    # heapq.merge 按距離合併，取到 count 個即停止，不會多掃描遠側的質數
+    # 距離相同時 merge 優先取較前的序列，即較大的質數排在前面
+    larger = ((prime, prime - number) for prime in iter_primes_near(number, 'larger'))
+    smaller = ((prime, number - prime) for prime in iter_primes_near(number, 'smaller'))
+    result = tuple(itertools.islice(heapq.merge(larger, smaller, key=operator.itemgetter(1)), count))
+    
+    larger_count = sum(1 for prime, _ in result if prime > number)
+    logger.info(f"查詢結果: 較大質數 {larger_count} 個, 較小質數 {len(result) - larger_count} 個")
+    
     return result
 
 def find_closest_primes(number, count=5):
@@ -171,34 +640,9 @@ def find_closest_primes(number, count=5):
     try:
         logger.info(f"查詢最接近 {number} 的質數，數量: {count}")
         
-        # 使用 PrimesDB 查找較大和較小的質數
-        larger_primes = find_primes_near(number, count, 'larger')
-        smaller_primes = find_primes_near(number, count, 'smaller')
-        
-        logger.info(f"查詢結果: 較大質數 {len(larger_primes)} 個, 較小質數 {len(smaller_primes)} 個")
-        
-        # 合併結果並計算距離
-        result = []
-        
-        # 處理較大的質數
-        for prime in larger_primes:
-            distance = prime - number
-            result.append((prime, distance))
-        
-        # 處理較小的質數
-        for prime in smaller_primes:
-            distance = number - prime
-            result.append((prime, distance))
-        
-        # 按距離排序
-        result.sort(key=lambda x: x[1])
-        
-        # 限制結果數量
-        result = result[:count]
-        
-        # 將結果轉換為字典
+        # 將緩存的元組結果轉換為字典（每次返回新的列表，調用方可自由修改）
         results = []
-        for prime, distance in result:
+        for prime, distance in _find_closest_primes_cached(number, count):
             results.append({
                 'prime': prime,
                 'distance': distance
@@ -221,19 +665,10 @@ def text_to_base36(text):
         return int(text)
     
     # 2. 檢查是否只包含英文字母和數字
-    if all(c.isalnum() and ord(c) < 128 for c in text):
+    if ASCII_ALNUM_RE.fullmatch(text):
         # 含有英文字母，視為36進位
-        result = 0
-        for char in text.upper():
-            if '0' <= char <= '9':
-                value = int(char)
-            elif 'A' <= char <= 'Z':
-                value = ord(char) - ord('A') + 10
-            else:
-                # 忽略不在36進位範圍內的字符
-                continue
-            result = result * 36 + value
-        return result
+        # 所有字符都是 0-9、A-Z、a-z，int() 在 C 層完成整個轉換
+        return int(text, 36)
     
     # 3. 包含其他Unicode字符，使用簡化的哈希方法
     # 使用簡單的哈希算法，避免超大數字
@@ -253,78 +688,59 @@ def base36_to_text(number, original_text):
         return str(number)
     
     # 2. 檢查是否只包含英文字母和數字
-    if all(c.isalnum() and ord(c) < 128 for c in original_text):
+    if ASCII_ALNUM_RE.fullmatch(original_text):
         # 含有英文字母，需要轉換回36進位表示
-        result = ""
-        temp = number
-        
-        # 獲取原始文字的長度（忽略非36進位字符）
-        valid_chars = 0
-        for char in original_text:
-            if ('0' <= char <= '9') or ('A' <= char <= 'Z') or ('a' <= char <= 'z'):
-                valid_chars += 1
-        
-        # 如果沒有有效字符，直接返回數字
-        if valid_chars == 0:
-            return str(number)
-        
-        # 轉換為36進位
-        while temp > 0 or len(result) < valid_chars:
-            digit = temp % 36
-            if digit < 10:
-                result = str(digit) + result
-            else:
-                result = chr(digit - 10 + ord('A')) + result
-            temp //= 36
-            
-            if len(result) >= valid_chars:
-                break
+        # 原始文字的每個字符都是有效的36進位字符，結果取與原文相同的長度
+        valid_chars = len(original_text)
         
-        # 如果結果長度不足，前面補0
-        while len(result) < valid_chars:
-            result = '0' + result
+        # 從低位到高位寫入 bytearray，最後反轉一次，避免重複拼接字符串；長度不足時高位補0
+        buf = bytearray()
+        temp = number
+        while len(buf) < valid_chars:
+            # divmod 一次調用同時得到商和餘數
+            temp, digit = divmod(temp, 36)
+            buf.append(BASE36_DIGITS[digit])
         
-        return result
+        buf.reverse()
+        return buf.decode('ascii')
     
     # 3. 包含Unicode字符，生成有趣的替換
     # 對於Unicode文字，生成一個相似但不同的Unicode字符
-    result = ""
+    # 根據數字生成一個小偏移，使字符略有變化但仍保持在同一Unicode區塊；偏移與字符無關，只需計算一次
+    cjk_offset = (number % 100) - 50  # 中文字符使用 -50 到 49 的偏移
+    other_offset = (number % 20) - 10  # 其他Unicode字符使用 -10 到 9 的偏移
+    
+    result = []
     for char in original_text:
         # 獲取字符的Unicode碼點
         code_point = ord(char)
         
-        # 根據數字生成一個小偏移，使字符略有變化但仍保持在同一Unicode區塊
-        # 對於中文字符，保持在中文區塊內
         if 0x4E00 <= code_point <= 0x9FFF:  # 中文字符範圍
-            # 計算一個偏移，保持在中文範圍內
-            offset = (number % 100) - 50  # -50 到 49 的偏移
-            new_code = code_point + offset
+            new_code = code_point + cjk_offset
             # 確保仍在中文範圍內
             if new_code < 0x4E00:
                 new_code = 0x4E00 + (new_code % 100)
             elif new_code > 0x9FFF:
                 new_code = 0x9FFF - (new_code % 100)
         else:
-            # 對於其他Unicode字符，使用較小的偏移
-            offset = (number % 20) - 10  # -10 到 9 的偏移
-            new_code = code_point + offset
+            new_code = code_point + other_offset
         
         # 將新的碼點轉換為字符
         try:
-            result += chr(new_code)
-        except:
+            result.append(chr(new_code))
+        except ValueError:
             # 如果轉換失敗，使用原始字符
-            result += char
+            result.append(char)
     
-    return result
+    return ''.join(result)
 
 def find_prime_replacements(words, count=5):
     """為每個單詞找到最接近的質數替換"""
     result = []
     
     for word in words:
-        original = word['original']
-        numeric = word['numeric']
+        original = word['word']
+        numeric = word['numeric_value']
         is_prime = word['is_prime']
         
         # 如果數字本身是質數，不需要替換
@@ -366,80 +782,113 @@ def find_prime_replacements(words, count=5):
     
     return result
 
+# 每個條目保存整段文字的分詞結果，條目較大，只保留少量最近使用的文字
+@functools.lru_cache(maxsize=256)
+def cut_text_auto(text):
+    """使用jieba對文本分詞並去除空白詞，返回元組以便 lru_cache 緩存"""
+    return tuple(word for word in jieba_tokenizer.cut(text, cut_all=False, HMM=True) if word.strip())
+
 def parse_text(text, chinese_mode="auto"):
     """
     解析文本，將其分割為單詞，並轉換為數字
     
+    返回的字典包含 word、word_html、numeric_value、is_prime、closest_prime、distance 六個鍵，
+    word_html 為經 HTML 轉義的單詞，供前端直接插入頁面；質數單詞的 closest_prime 和 distance 為 None
+    
     chinese_mode 參數控制中文處理方式:
     - "auto": 自動使用jieba進行詞彙分割
     - "char": 將每個中文字符視為獨立單元
     - "space": 使用空格作為分隔符，由用戶手動分詞
     """
     # 檢查文本是否包含中文字符
-    has_chinese = any(0x4E00 <= ord(c) <= 0x9FFF for c in text)
+    has_chinese = CJK_RE.search(text) is not None
     
     if has_chinese:
         if chinese_mode == "char":
-            # 按字符處理中文
-            chinese_chars = [c for c in text if 0x4E00 <= ord(c) <= 0x9FFF]
+            # 按字符處理中文：正則表達式在 C 層一次提取所有中文字符
+            chinese_chars = CJK_RE.findall(text)
             
             # 提取非中文部分（按空格分割）
-            non_chinese = []
-            for part in text.split():
-                if not any(0x4E00 <= ord(c) <= 0x9FFF for c in part):
-                    non_chinese.append(part)
+            non_chinese = [part for part in text.split() if not CJK_RE.search(part)]
             
             # 合併所有單元
             words = chinese_chars + non_chinese
         
         elif chinese_mode == "space":
-            # 使用空格作為分隔符，由用戶手動分詞
-            words = [word for word in text.split() if word]
+            # 使用空格作為分隔符，由用戶手動分詞；不帶參數的 split() 不會產生空字符串，無需再過濾
+            words = text.split()
         
         else:  # "auto" 模式，使用jieba分詞
-            # 使用jieba進行中文分詞
-            seg_list = jieba.cut(text, cut_all=False)
-            words = [word for word in seg_list if word.strip()]
+            # 使用jieba進行中文分詞（相同文本的分詞結果已緩存）
+            if len(text) <= TEXT_CACHE_MAX_LENGTH:
+                words = cut_text_auto(text)
+            else:
+                words = cut_text_auto.__wrapped__(text)
     else:
         # 對於非中文文本，按空格分割
-        words = [word for word in text.split() if word]
+        words = text.split()
     
-    # 轉換每個單詞為數字
+    # 分析每個單詞，直接生成 /analyze 響應中 word_analysis 的格式
+    # 在線程池中並行處理，PrimesDB 映射為唯讀，可安全地被多個線程共用；重複的單詞直接命中 analyze_word 的緩存
     result = []
-    for word in words:
-        num_value = text_to_base36(word)
+    for word, (num_value, word_is_prime, closest_prime, distance) in zip(
+            words, analysis_executor.map(analyze_word, words)):
         result.append({
-            'original': word,
-            'numeric': num_value,
-            'is_prime': is_prime_primesdb(num_value)
+            'word': word,
+            'word_html': html.escape(word),
+            'numeric_value': num_value,
+            'is_prime': word_is_prime,
+            'closest_prime': closest_prime,
+            'distance': distance
         })
     
     return result
 
+@functools.lru_cache(maxsize=8192)
+def analyze_word(word):
+    """計算單詞的數值、是否為質數及最接近的質數，返回 (數值, 是否質數, 最接近的質數, 距離)；結果以 lru_cache 緩存"""
+    num_value = text_to_base36(word)
+    if is_prime_primesdb(num_value):
+        # 質數本身不需要查找最接近的質數
+        return num_value, True, None, None
+    
+    # 直接調用緩存的查詢而非 find_closest_primes：後者出錯時返回空列表，會被 lru_cache 永久保存，
+    # 讓異常傳出，本次請求返回錯誤，之後的請求會重新查詢
+    closest_primes = _find_closest_primes_cached(num_value, 1)
+    if not closest_primes:
+        return num_value, False, None, None
+    prime, distance = closest_primes[0]
+    return num_value, False, prime, distance
+
 def generate_random_combinations(words, max_combinations=5):
     """生成隨機的質數替換組合"""
     if not words:
         return []
     
-    combinations = []
-    
     # 計算可能的組合數量
     max_possible = min(max_combinations, 10)  # 限制最大組合數
     
-    for _ in range(max_possible):
+    # 每個單詞一次抽取所有組合所需的替換，只調用一次 random.choices，而不是每個組合各調用一次 random.choice
+    # 原詞已經是質數或沒有替換選項時為 None，表示保留原詞
+    picks = [
+        random.choices(word['replacements'], k=max_possible)
+        if not word['is_prime'] and word['replacements'] else None
+        for word in words
+    ]
+    
+    combinations = []
+    for i in range(max_possible):
         combination = []
-        for word in words:
-            if word['is_prime']:
-                # 如果原詞已經是質數，保留原詞
+        for word, word_picks in zip(words, picks):
+            if word_picks is None:
                 combination.append({
                     'original': word['original'],
                     'replacement': word['original'],
                     'numeric': word['numeric'],
                     'is_original': True
                 })
-            elif word['replacements']:
-                # 隨機選擇一個替換
-                replacement = random.choice(word['replacements'])
+            else:
+                replacement = word_picks[i]
                 combination.append({
                     'original': word['original'],
                     'replacement': replacement['text'],
@@ -448,22 +897,50 @@ def generate_random_combinations(words, max_combinations=5):
                     'direction': replacement['direction'],
                     'is_original': False
                 })
-            else:
-                # 沒有替換選項，保留原詞
-                combination.append({
-                    'original': word['original'],
-                    'replacement': word['original'],
-                    'numeric': word['numeric'],
-                    'is_original': True
-                })
         
         combinations.append(combination)
     
     return combinations
 
+# 文字長度受 TEXT_CACHE_MAX_LENGTH 限制，整個緩存最多約 128 × 31 KB ≈ 4 MB
+@functools.lru_cache(maxsize=128)
+def build_analysis_response(text, chinese_mode):
+    """分析文字並序列化為 JSON，返回 (ETag, 響應主體)；結果以 lru_cache 緩存"""
+    # 解析文字，並計算每個單詞的數值、是否為質數及最接近的質數
+    word_analysis = parse_text(text, chinese_mode)
+    numeric_values = [str(word['numeric_value']) for word in word_analysis]
+    
+    payload = {
+        "original_text": text,
+        "original_text_html": html.escape(text),
+        "numeric_values": numeric_values,
+        "word_analysis": word_analysis
+    }
+    try:
+        # orjson 在 C 層直接序列化為 UTF-8 bytes
+        body = orjson.dumps(payload)
+    except orjson.JSONEncodeError:
+        # orjson 不支持超過 64 位的整數（例如很長的數字或字母串），改用標準庫序列化
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    return etag, body
+
 @app.route('/')
 def index():
-    return render_template_string(get_index_template())
+    """返回預先生成的首頁，客戶端支持時使用 gzip 壓縮，並支持 ETag 重新驗證"""
+    if request.accept_encodings['gzip']:
+        response = Response(INDEX_HTML_GZ, mimetype='text/html')
+        response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag(INDEX_ETAG + '-gzip')
+    else:
+        response = Response(INDEX_HTML, mimetype='text/html')
+        response.set_etag(INDEX_ETAG)
+    response.vary.add('Accept-Encoding')
+    # 首頁只在重新部署時改變：允許瀏覽器緩存一小時，過期後再以 ETag 重新驗證
+    response.cache_control.public = True
+    response.cache_control.max_age = INDEX_MAX_AGE
+    # 客戶端的 If-None-Match 與 ETag 相符時返回 304
+    return response.make_conditional(request)
 
 @app.route('/analyze', methods=['POST'])
 def search():
@@ -471,49 +948,45 @@ def search():
         data = request.json
         text = data.get('text', '')
         chinese_mode = data.get('chinese_mode', 'auto')
+        # 模式會作為緩存鍵，未知的值（包括不可哈希的值）統一按 "auto" 處理
+        if chinese_mode not in CHINESE_MODES:
+            chinese_mode = 'auto'
         
         if not text:
             return jsonify({"error": "請提供文字"}), 400
         
-        # 解析文字
-        parsed_words = parse_text(text, chinese_mode)
-        
-        # 計算每個單詞的數值並檢查是否為質數
-        word_analysis = []
-        numeric_values = []
-        
-        for word in parsed_words:
-            numeric_value = word['numeric']
-            numeric_values.append(str(numeric_value))
-            
-            is_prime = word['is_prime']
-            closest_prime = None
-            distance = None
-            
-            if not is_prime:
-                closest_primes = find_closest_primes(numeric_value, 1)
-                if closest_primes and len(closest_primes) > 0:
-                    closest_prime = closest_primes[0]['prime']
-                    distance = closest_primes[0]['distance']
-            
-            word_analysis.append({
-                "word": word['original'],
-                "numeric_value": numeric_value,
-                "is_prime": is_prime,
-                "closest_prime": closest_prime,
-                "distance": distance
-            })
+        # 相同的輸入直接使用緩存的響應；過長的文字直接計算，不佔用緩存
+        if len(text) <= TEXT_CACHE_MAX_LENGTH:
+            etag, body = build_analysis_response(text, chinese_mode)
+        else:
+            etag, body = build_analysis_response.__wrapped__(text, chinese_mode)
+        # 客戶端已持有相同結果時返回 304，不再傳輸響應主體
+        if request.headers.get('If-None-Match') == etag:
+            return '', 304, {'ETag': etag}
         
-        return jsonify({
-            "original_text": text,
-            "numeric_values": numeric_values,
-            "word_analysis": word_analysis
-        })
+        return body, 200, {
+            'Content-Type': 'application/json',
+            'ETag': etag,
+            'Cache-Control': 'no-cache'
+        }
         
     except Exception as e:
         logger.error(f"處理請求時發生錯誤: {str(e)}")
         return jsonify({"error": f"處理請求時發生錯誤: {str(e)}"}), 500
 
+@app.route('/debug/cache_info')
+def cache_info():
+    """顯示質數查詢緩存的統計資料，用於調整 maxsize（僅在調試模式下可用）"""
+    if not app.debug:
+        abort(404)
+    return jsonify({
+        "is_prime_primesdb": is_prime_primesdb.cache_info()._asdict(),
+        "find_closest_primes": _find_closest_primes_cached.cache_info()._asdict(),
+        "cut_text_auto": cut_text_auto.cache_info()._asdict(),
+        "analyze_word": analyze_word.cache_info()._asdict(),
+        "analysis_response": build_analysis_response.cache_info()._asdict()
+    })
+
 def get_index_template():
     """獲取首頁模板"""
     return """
@@ -766,6 +1239,9 @@ def get_index_template():
                 padding: 15px;
                 margin-bottom: 15px;
                 transition: var(--transition);
+                /* 單詞較多時，瀏覽器可跳過畫面外卡片的排版與繪製 */
+                content-visibility: auto;
+                contain-intrinsic-size: auto 100px;
             }
             
             .word-info:hover {
@@ -798,6 +1274,21 @@ def get_index_template():
                 display: none;
             }
             
+            /* 結果區域的顯示狀態由 .result-section 上的類名決定，切換時只需寫入一次 className */
+            #result {
+                display: none;
+            }
+            
+            .result-section.has-result #result,
+            .result-section.has-prime .celebration {
+                display: block;
+            }
+            
+            .result-section.is-loading .result-placeholder,
+            .result-section.has-result .result-placeholder {
+                display: none;
+            }
+            
             .celebration h3 {
                 color: var(--success-color);
                 margin-top: 0;
@@ -1117,12 +1608,12 @@ def get_index_template():
                     </form>
                 </section>
                 
-                <section class="result-section">
+                <section class="result-section" id="result_section">
                     <div class="result-placeholder" id="result_placeholder">
                         <h3>計算結果將顯示在這裡</h3>
                         <p>請在左側輸入文字並點擊「計算」按鈕</p>
                     </div>
-                    <div id="result" style="display: none;">
+                    <div id="result">
                         <div class="result-card">
                             <h3>計算結果</h3>
                             <div id="prime_result"></div>
@@ -1158,15 +1649,52 @@ def get_index_template():
                 const textInput = document.getElementById('text');
                 const chineseModeSelect = document.getElementById('chinese_mode');
                 const clearBtn = document.getElementById('clear_btn');
+                const resultSection = document.getElementById('result_section');
                 const resultDiv = document.getElementById('result');
-                const resultPlaceholder = document.getElementById('result_placeholder');
                 const primeResultDiv = document.getElementById('prime_result');
                 const wordAnalysisDiv = document.getElementById('word_analysis');
-                const celebrationDiv = document.getElementById('celebration');
                 const copyPrimeBtn = document.getElementById('copy_prime_btn');
                 const copyAnalysisBtn = document.getElementById('copy_analysis_btn');
                 const exportCsvBtn = document.getElementById('export_csv_btn');
                 
+                // 單詞分析首批同步渲染的數量，其餘按此大小分批在後續幀中渲染
+                const WORD_RENDER_CHUNK = 50;
+                // 每次提交或清除時遞增，使上一次尚未完成的分批渲染自行停止
+                let renderToken = 0;
+                // 最近一次的分析結果，複製與導出直接讀取，不依賴尚未渲染完的 DOM
+                let lastAnalysis = [];
+                
+                // 以一次 className 寫入切換佔位、加載中、結果及慶祝訊息的顯示
+                function setResultState(...states) {
+                    resultSection.className = ['result-section', ...states].join(' ');
+                }
+                
+                function wordInfoHtml(word) {
+                    let html = `<div class="word-info ${word.is_prime ? 'is-prime' : ''}">`;
+                    html += `<h4>${word.word_html} (${word.numeric_value})</h4>`;
+                    
+                    if (word.is_prime) {
+                        html += `<p class="prime-item">🎉 這是一個質數！</p>`;
+                    } else if (word.closest_prime) {
+                        html += `<p class="prime-item">${word.closest_prime} (距離：${word.distance})</p>`;
+                    }
+                    
+                    return html + '</div>';
+                }
+                
+                function renderWordChunk(words, start, token) {
+                    if (token !== renderToken) return;
+                    const end = Math.min(start + WORD_RENDER_CHUNK, words.length);
+                    let html = '';
+                    for (let i = start; i < end; i++) {
+                        html += wordInfoHtml(words[i]);
+                    }
+                    wordAnalysisDiv.insertAdjacentHTML('beforeend', html);
+                    if (end < words.length) {
+                        requestAnimationFrame(() => renderWordChunk(words, end, token));
+                    }
+                }
+                
                 form.addEventListener('submit', function(e) {
                     e.preventDefault();
                     
@@ -1177,10 +1705,10 @@ def get_index_template():
                     }
                     
                     const chineseMode = chineseModeSelect.value;
+                    const token = ++renderToken;
                     
                     // 顯示加載中
-                    resultDiv.style.display = 'none';
-                    resultPlaceholder.style.display = 'none';
+                    setResultState('is-loading');
                     primeResultDiv.innerHTML = '<p>計算中...</p>';
                     
                     // 發送請求
@@ -1196,61 +1724,43 @@ def get_index_template():
                     })
                     .then(response => response.json())
                     .then(data => {
-                        // 顯示結果
-                        resultDiv.style.display = 'block';
-                        resultPlaceholder.style.display = 'none';
-                        
+                        if (token !== renderToken) return;
+                        // 結果區域在提交時已隱藏，先填入全部內容再一次性顯示，避免對可見元素多次觸發排版
                         // 顯示計算結果
                         let primeResultHtml = '';
                         if (data.numeric_values) {
-                            primeResultHtml += `<p>原始文字：<strong>${data.original_text}</strong></p>`;
+                            // 文字由伺服器預先轉義（*_html 欄位），可直接插入 innerHTML
+                            primeResultHtml += `<p>原始文字：<strong>${data.original_text_html}</strong></p>`;
                             primeResultHtml += `<p>數值表示：<strong>${data.numeric_values.join(' ')}</strong></p>`;
                         }
                         primeResultDiv.innerHTML = primeResultHtml;
                         
-                        // 顯示單詞分析
-                        let wordAnalysisHtml = '';
-                        let hasPrime = false;
+                        // 顯示單詞分析：首批同步渲染，其餘透過 requestAnimationFrame 分批追加，避免大量單詞阻塞主線程
+                        const words = data.word_analysis || [];
+                        const hasPrime = words.some(word => word.is_prime);
+                        lastAnalysis = words;
+                        wordAnalysisDiv.innerHTML = '';
+                        renderWordChunk(words, 0, token);
                         
-                        if (data.word_analysis) {
-                            data.word_analysis.forEach(word => {
-                                const isPrime = word.is_prime;
-                                if (isPrime) hasPrime = true;
-                                
-                                wordAnalysisHtml += `<div class="word-info ${isPrime ? 'is-prime' : ''}">`;
-                                wordAnalysisHtml += `<h4>${word.word} (${word.numeric_value})</h4>`;
-                                
-                                if (isPrime) {
-                                    wordAnalysisHtml += `<p class="prime-item">🎉 這是一個質數！</p>`;
-                                } else if (word.closest_prime) {
-                                    wordAnalysisHtml += `<p class="prime-item">${word.closest_prime} (距離：${word.distance})</p>`;
-                                }
-                                
-                                wordAnalysisHtml += '</div>';
-                            });
-                        }
-                        
-                        wordAnalysisDiv.innerHTML = wordAnalysisHtml;
-                        
-                        // 如果有質數，顯示慶祝訊息
-                        celebrationDiv.style.display = hasPrime ? 'block' : 'none';
+                        // 顯示結果，如果有質數，同時顯示慶祝訊息
+                        setResultState('has-result', ...(hasPrime ? ['has-prime'] : []));
                         
                         // 滾動到結果區域
                         resultDiv.scrollIntoView({ behavior: 'smooth' });
                     })
                     .catch(error => {
+                        if (token !== renderToken) return;
                         console.error('Error:', error);
                         primeResultDiv.innerHTML = '<p class="error">發生錯誤，請稍後再試</p>';
-                        resultDiv.style.display = 'block';
-                        resultPlaceholder.style.display = 'none';
+                        setResultState('has-result');
                     });
                 });
                 
                 // 清除按鈕
                 clearBtn.addEventListener('click', function() {
+                    renderToken++;
                     textInput.value = '';
-                    resultDiv.style.display = 'none';
-                    resultPlaceholder.style.display = 'block';
+                    setResultState();
                     textInput.focus();
                 });
                 
@@ -1301,8 +1811,14 @@ def get_index_template():
                 // 複製分析結果按鈕
                 copyAnalysisBtn.addEventListener('click', function() {
                     let analysisText = '';
-                    document.querySelectorAll('#word_analysis .word-info').forEach(wordDiv => {
-                        analysisText += wordDiv.textContent.replace(/\\s+/g, ' ').trim() + '\\n\\n';
+                    lastAnalysis.forEach(word => {
+                        let line = `${word.word} (${word.numeric_value})`;
+                        if (word.is_prime) {
+                            line += '🎉 這是一個質數！';
+                        } else if (word.closest_prime) {
+                            line += `${word.closest_prime} (距離：${word.distance})`;
+                        }
+                        analysisText += line.replace(/\\s+/g, ' ').trim() + '\\n\\n';
                     });
                     copyToClipboard(analysisText);
                     showCopyMessage(this);
@@ -1312,22 +1828,17 @@ def get_index_template():
                 exportCsvBtn.addEventListener('click', function() {
                     let csvContent = '原始文字,數值,是否質數,最接近質數,距離\\n';
                     
-                    document.querySelectorAll('#word_analysis .word-info').forEach(wordDiv => {
-                        const title = wordDiv.querySelector('h4').textContent;
-                        const isPrime = wordDiv.classList.contains('is-prime');
-                        const original = title.split(' ')[0];
-                        const numeric = title.match(/\\((\\d+)\\)/)[1];
-                        
+                    lastAnalysis.forEach(word => {
+                        const isPrime = word.is_prime;
                         let closestPrime = '';
                         let distance = '';
                         
-                        if (!isPrime && wordDiv.querySelector('.prime-item')) {
-                            const primeInfo = wordDiv.querySelector('.prime-item').textContent.trim();
-                            closestPrime = primeInfo.split(' ')[0];
-                            distance = primeInfo.match(/距離：(\\d+)/)[1];
+                        if (!isPrime && word.closest_prime) {
+                            closestPrime = word.closest_prime;
+                            distance = word.distance;
                         }
                         
-                        csvContent += `"${original}","${numeric}","${isPrime ? '是' : '否'}","${closestPrime}","${distance}"\\n`;
+                        csvContent += `"${word.word}","${word.numeric_value}","${isPrime ? '是' : '否'}","${closestPrime}","${distance}"\\n`;
                     });
                     
                     const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
@@ -1348,11 +1859,32 @@ def get_index_template():
     </html>
     """
 
+# 首頁不含模板變量，在導入時生成一次，並預先壓縮和計算 ETag
+INDEX_HTML = get_index_template().encode('utf-8')
+INDEX_HTML_GZ = gzip.compress(INDEX_HTML, 9)
+INDEX_ETAG = hashlib.blake2b(INDEX_HTML, digest_size=16).hexdigest()
+# 瀏覽器緩存首頁的秒數
+INDEX_MAX_AGE = 3600
+
 # 使用 with app.app_context() 預加載 PrimesDB 數據
 with app.app_context():
-    # 預加載 PrimesDB 數據
-    download_primesdb()
+    # 在後台線程中預加載 PrimesDB 數據，下載不阻塞啟動；
+    # 數據就緒前到達的查詢會在 download_primesdb 中等待同一把鎖，而不是重複下載
+    threading.Thread(target=preload_primesdb, name='primesdb-preload', daemon=True).start()
+    # gunicorn --preload 等以 fork 創建 worker 時，先等待加載完成，讓子進程繼承已映射的數據
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(before=primesdb_ready.wait)
+    # 預先載入jieba詞典，避免第一個中文請求承擔載入時間
+    jieba_tokenizer.initialize()
+    # 預先建立小質數位圖篩，避免第一個查詢承擔建表時間
+    get_small_sieve()
 
 if __name__ == '__main__':
     logger.info("Starting 文字與質數的距離 v1.0.0")
-    app.run(host='127.0.0.1', port=5004, debug=True)
+    # 綁定地址、端口和調試模式可由環境變量設置；調試模式默認關閉，並使用多線程處理並發請求
+    app.run(
+        host=os.environ.get('HOST', '127.0.0.1'),
+        port=int(os.environ.get('PORT', '5004')),
+        debug=os.environ.get('DEBUG') == '1',
+        threaded=True
+    )